@@ -1,108 +1,284 @@
 #!/usr/bin/env python3
 import json
 import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import simdjson  # type: ignore[import-not-found]
+except ImportError:
+    simdjson = None
 
 HOME = Path.home()
 
+_FST = ".fst"
+_SNAPS = os.path.join(_FST, "snapshots")
+_MANIFS = os.path.join(_FST, "manifests")
+_CONFIG = os.path.join(_FST, "config.json")
 
-def load_json(path: Path):
-    try:
-        return json.loads(path.read_text())
-    except FileNotFoundError:
-        return None
+# Parsed JSON keyed by path, validated against (st_mtime_ns, st_size) so the
+# same config/meta file is only read and parsed once per run.
+_JSON_CACHE: dict[str, tuple[int, int, Any]] = {}
+
+# pick_snapshot_id results keyed by snapshots dir, then prefer. Entries are
+# dropped when copy_base_snapshot adds a snapshot to that dir.
+_PICK_CACHE: dict[str, dict[str, Optional[str]]] = {}
 
+# Nearest ancestor containing fst.json (or None) for every resolved directory
+# visited by find_parent_root, so sibling workspaces share one climb.
+_PARENT_CACHE: dict[str, Optional[str]] = {}
 
-def save_json(path: Path, data):
-    path.write_text(json.dumps(data, indent=2) + "\n")
+# os.path.realpath results keyed by the path as given.
+_RESOLVE_CACHE: dict[str, str] = {}
 
+# Directories already created or confirmed by ensure_dir during this run.
+_ENSURED_DIRS: set[str] = set()
 
-def get_global_config_dir() -> Path:
+# Snapshot dirs with at least this many metas have their files read through
+# _READ_POOL; parsing stays on the scanning thread.
+_BATCH_READ_MIN = 16
+_READ_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    if simdjson is not None:
+        return simdjson.loads(raw)
+    return json.loads(raw)
+
+
+def load_json(path: str) -> Any:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _JSON_CACHE.pop(path, None)
+        return None
+    cached = _JSON_CACHE.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    with open(path, "rb") as f:
+        data = _loads(f.read())
+    _JSON_CACHE[path] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
+def save_json(path: str, data: Any) -> None:
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+    else:
+        # Stream chunks into the file buffer instead of building the string
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+    st = os.stat(path)
+    _JSON_CACHE[path] = (st.st_mtime_ns, st.st_size, data)
+
+
+def get_global_config_dir() -> str:
     config_home = os.environ.get("XDG_CONFIG_HOME")
     if not config_home:
         config_home = str(HOME / ".config")
-    return Path(config_home) / "fst"
+    return os.path.join(config_home, "fst")
+
 
+def resolve_path(path: str) -> str:
+    resolved = _RESOLVE_CACHE.get(path)
+    if resolved is None:
+        resolved = os.path.realpath(path)
+        _RESOLVE_CACHE[path] = resolved
+    return resolved
 
-def find_parent_root(start: Path):
-    cur = start.resolve()
+
+def find_parent_root(start: str) -> Optional[str]:
+    cur = resolve_path(start)
+    visited: list[str] = []
+    root: Optional[str]
     while True:
-        candidate = cur / "fst.json"
-        if candidate.exists():
-            return cur
-        if cur.parent == cur:
-            return None
-        cur = cur.parent
+        if cur in _PARENT_CACHE:
+            root = _PARENT_CACHE[cur]
+            break
+        visited.append(cur)
+        if os.path.exists(os.path.join(cur, "fst.json")):
+            root = cur
+            break
+        parent = os.path.dirname(cur)
+        if parent == cur:
+            root = None
+            break
+        cur = parent
+    for d in visited:
+        _PARENT_CACHE[d] = root
+    return root
+
+
+def seed_parent_roots(roots: Iterable[str]) -> None:
+    """Record directories known to contain fst.json as their own parent root.
+
+    Cache keys are realpaths, so only absolute, normalized paths are seeded;
+    anything else simply never matches and the climb stats as usual.
+    """
+    for root in roots:
+        if os.path.isabs(root) and os.path.normpath(root) == root:
+            _PARENT_CACHE[root] = root
+
+
+# fromisoformat accepts a trailing "Z" natively from 3.11 on
+_FROMISOFORMAT_Z = sys.version_info >= (3, 11)
+
 
+def parse_timestamp(value: str) -> datetime:
+    if not _FROMISOFORMAT_Z and value.endswith("Z"):
+        value = f"{value[:-1]}+00:00"
+    return datetime.fromisoformat(value)
 
-def load_snapshot_meta(meta_path: Path):
+
+def load_snapshot_meta(meta_path: str) -> Any:
     try:
-        return json.loads(meta_path.read_text())
+        return load_json(meta_path)
     except Exception:
         return None
 
 
-def pick_snapshot_id(snapshots_dir: Path, prefer="earliest"):
-    if not snapshots_dir.exists():
+def pick_snapshot_id(snapshots_dir: str, prefer: str = "earliest") -> Optional[str]:
+    picks = _PICK_CACHE.setdefault(snapshots_dir, {})
+    if prefer not in picks:
+        picks[prefer] = _scan_snapshot_id(snapshots_dir, prefer)
+    return picks[prefer]
+
+
+def _read_bytes(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _iter_snapshot_metas(meta_paths: list[str]) -> Iterator[Any]:
+    if len(meta_paths) < _BATCH_READ_MIN:
+        yield from map(load_snapshot_meta, meta_paths)
+        return
+    for raw in _READ_POOL.map(_read_bytes, meta_paths):
+        if raw is None:
+            yield None
+            continue
+        try:
+            yield _loads(raw)
+        except Exception:
+            yield None
+
+
+def _scan_snapshot_id(snapshots_dir: str, prefer: str) -> Optional[str]:
+    try:
+        it = os.scandir(snapshots_dir)
+    except OSError:
         return None
-    metas = []
-    for meta_path in snapshots_dir.glob("*.meta.json"):
-        meta = load_snapshot_meta(meta_path)
+    with it:
+        meta_paths = [
+            entry.path
+            for entry in it
+            if entry.name.endswith(".meta.json") and entry.is_file()
+        ]
+    latest = prefer == "latest"
+    best_id: Optional[str] = None
+    best_key: Optional[tuple[bool, datetime]] = None
+    for meta in _iter_snapshot_metas(meta_paths):
         if not meta:
             continue
+        sid = meta.get("id")
+        if not sid:
+            continue
         created_at = meta.get("created_at")
+        ts: Optional[datetime]
         if created_at:
             try:
-                ts = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+                ts = parse_timestamp(created_at)
             except Exception:
                 ts = None
         else:
             ts = None
-        metas.append((meta.get("id"), ts))
-    metas = [(sid, ts) for sid, ts in metas if sid]
-    if not metas:
-        return None
-    metas.sort(key=lambda x: (x[1] is None, x[1] or datetime.max))
-    if prefer == "latest":
-        return metas[-1][0]
-    return metas[0][0]
+        # Undated snapshots sort after dated ones; ties keep the first
+        # earliest and the last latest, as a stable sort would.
+        key = (ts is None, ts or datetime.max)
+        if best_key is None or (key >= best_key if latest else key < best_key):
+            best_id, best_key = sid, key
+    return best_id
+
+
+def prefetch_snapshot_ids(snapshots_dirs: Iterable[str], prefer: str = "earliest") -> None:
+    """Scan uncached snapshots dirs in parallel and seed the pick cache."""
+    dirs = [d for d in dict.fromkeys(snapshots_dirs) if prefer not in _PICK_CACHE.get(d, {})]
+    if len(dirs) < 2:
+        return
+    workers = min(32, (os.cpu_count() or 1) * 4, len(dirs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda d: _scan_snapshot_id(d, prefer), dirs)
+        for snapshots_dir, base_id in zip(dirs, results):
+            _PICK_CACHE.setdefault(snapshots_dir, {})[prefer] = base_id
 
 
-def copy_base_snapshot(source_path: Path, target_path: Path, base_id: str) -> bool:
-    source_snapshots = source_path / ".fst" / "snapshots"
-    source_manifests = source_path / ".fst" / "manifests"
-    target_snapshots = target_path / ".fst" / "snapshots"
-    target_manifests = target_path / ".fst" / "manifests"
+def ensure_dir(path: str) -> None:
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
 
-    meta_path = source_snapshots / f"{base_id}.meta.json"
+
+def link_or_copy(src: str, dst: str) -> None:
+    # Snapshot metas and manifests are only ever replaced via rename, never
+    # rewritten in place, so sharing an inode between workspaces is safe.
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def find_base_snapshot(source_path: str, base_id: str) -> Optional[tuple[str, str]]:
+    """Return (meta_path, manifest_path) of base_id in source_path, or None."""
+    meta_path = os.path.join(source_path, _SNAPS, f"{base_id}.meta.json")
     meta_data = load_json(meta_path)
     if not meta_data:
-        return False
+        return None
     manifest_hash = meta_data.get("manifest_hash")
     if not manifest_hash:
-        return False
+        return None
+
+    manifest_path = os.path.join(source_path, _MANIFS, f"{manifest_hash}.json")
+    if not os.path.exists(manifest_path):
+        return None
+    return meta_path, manifest_path
 
-    manifest_path = source_manifests / f"{manifest_hash}.json"
-    if not manifest_path.exists():
-        return False
 
-    target_snapshots.mkdir(parents=True, exist_ok=True)
-    target_manifests.mkdir(parents=True, exist_ok=True)
+def copy_base_snapshot(meta_path: str, manifest_path: str, target_path: str) -> None:
+    target_snapshots = os.path.join(target_path, _SNAPS)
+    target_manifests = os.path.join(target_path, _MANIFS)
 
-    target_meta = target_snapshots / f"{base_id}.meta.json"
-    target_manifest = target_manifests / f"{manifest_hash}.json"
+    ensure_dir(target_snapshots)
+    ensure_dir(target_manifests)
 
-    if not target_meta.exists():
-        target_meta.write_text(json.dumps(meta_data, indent=2) + "\n")
-    if not target_manifest.exists():
-        target_manifest.write_text(manifest_path.read_text())
-    return True
+    target_meta = os.path.join(target_snapshots, os.path.basename(meta_path))
+    target_manifest = os.path.join(target_manifests, os.path.basename(manifest_path))
 
+    if not os.path.exists(target_meta):
+        _PICK_CACHE.pop(target_snapshots, None)
+        link_or_copy(meta_path, target_meta)
+    if not os.path.exists(target_manifest):
+        link_or_copy(manifest_path, target_manifest)
 
-def main():
+
+def main() -> None:
     cfg_dir = get_global_config_dir()
-    index_path = cfg_dir / "index.json"
+    index_path = os.path.join(cfg_dir, "index.json")
     index = load_json(index_path)
     if index is None:
         print(f"No index found at {index_path}")
@@ -111,10 +287,16 @@ def main():
     workspaces = index.get("workspaces", [])
     projects = index.get("projects", [])
 
-    ws_by_id = {w.get("workspace_id"): w for w in workspaces if w.get("workspace_id")}
-    ws_by_project = {}
-    for w in workspaces:
-        pid = w.get("project_id")
+    # Per-workspace columns, read out of the index dicts once
+    ws_paths = [w.get("path") for w in workspaces]
+    ws_ids = [w.get("workspace_id") for w in workspaces]
+    ws_pids = [w.get("project_id") for w in workspaces]
+    ws_with_path = [i for i, path in enumerate(ws_paths) if path]
+    ws_cfg_paths = [os.path.join(path, _CONFIG) if path else "" for path in ws_paths]
+
+    ws_by_id = {wid: w for w, wid in zip(workspaces, ws_ids) if wid}
+    ws_by_project: dict[str, list[dict[str, Any]]] = {}
+    for w, pid in zip(workspaces, ws_pids):
         if not pid:
             continue
         ws_by_project.setdefault(pid, []).append(w)
@@ -124,12 +306,18 @@ def main():
     updated_parents = 0
     copied_bases = 0
 
+    # Scan snapshots of workspaces that will need a picked base up front
+    pending = []
+    for i in ws_with_path:
+        cfg = load_json(ws_cfg_paths[i])
+        if cfg is not None and not cfg.get("base_snapshot_id") and not cfg.get("fork_snapshot_id"):
+            pending.append(os.path.join(ws_paths[i], _SNAPS))
+    prefetch_snapshot_ids(pending)
+
     # Fix workspace configs + index base_snapshot_id
-    for w in workspaces:
-        path = w.get("path")
-        if not path:
-            continue
-        cfg_path = Path(path) / ".fst" / "config.json"
+    for i in ws_with_path:
+        path = ws_paths[i]
+        cfg_path = ws_cfg_paths[i]
         cfg = load_json(cfg_path)
         if cfg is None:
             continue
@@ -139,7 +327,7 @@ def main():
             cfg.pop("fork_snapshot_id", None)
             changed = True
         if not cfg.get("base_snapshot_id"):
-            snapshots_dir = Path(path) / ".fst" / "snapshots"
+            snapshots_dir = os.path.join(path, _SNAPS)
             base_id = pick_snapshot_id(snapshots_dir, prefer="earliest")
             if base_id:
                 cfg["base_snapshot_id"] = base_id
@@ -151,125 +339,125 @@ def main():
             updated_configs += 1
 
         base_id = cfg.get("base_snapshot_id")
+        w = workspaces[i]
         if base_id and not w.get("base_snapshot_id"):
             w["base_snapshot_id"] = base_id
             updated_index += 1
 
-    # Fix parent configs
+    prefetch_snapshot_ids(
+        os.path.join(ws_paths[i], _SNAPS)
+        for i in ws_with_path
+        if ws_pids[i] and not workspaces[i].get("base_snapshot_id")
+    )
+
+    known_roots = {
+        p["project_path"]
+        for p in projects
+        if p.get("project_path") and os.path.exists(os.path.join(p["project_path"], "fst.json"))
+    }
+    # Workspace climbs stop at an indexed project root without stat'ing it
+    seed_parent_roots(known_roots)
+
+    # Fix parent configs and copy base snapshot metadata/manifests to all
+    # workspaces in a single pass over projects
+    parent_state: dict[str, tuple[str, str]] = {}
     for p in projects:
         pid = p.get("project_id")
         if not pid:
             continue
         parent_root = None
         project_path = p.get("project_path")
-        if project_path:
-            candidate = Path(project_path) / "fst.json"
-            if candidate.exists():
-                parent_root = Path(project_path)
+        if project_path in known_roots:
+            parent_root = project_path
         if parent_root is None:
             for w in ws_by_project.get(pid, []):
                 wpath = w.get("path")
                 if not wpath:
                     continue
-                parent_root = find_parent_root(Path(wpath))
+                parent_root = find_parent_root(wpath)
                 if parent_root:
                     break
         if not parent_root:
             continue
 
-        parent_cfg_path = parent_root / "fst.json"
-        parent_cfg = load_json(parent_cfg_path)
-        if parent_cfg is None:
-            continue
+        # Projects sharing a parent root reuse its settled base instead of
+        # re-reading fst.json
+        state = parent_state.get(parent_root)
+        if state is None:
+            parent_cfg_path = os.path.join(parent_root, "fst.json")
+            parent_cfg = load_json(parent_cfg_path)
+            if parent_cfg is None:
+                continue
 
-        if not parent_cfg.get("base_snapshot_id"):
-            # pick base workspace
-            base_ws = None
-            base_ws_id = parent_cfg.get("base_workspace_id")
-            if base_ws_id and base_ws_id in ws_by_id:
-                base_ws = ws_by_id[base_ws_id]
-            if base_ws is None:
-                candidates = ws_by_project.get(pid, [])
-                best = None
-                for w in candidates:
-                    wpath = w.get("path")
-                    if not wpath:
+            if not parent_cfg.get("base_snapshot_id"):
+                # pick base workspace
+                base_ws = None
+                base_ws_id = parent_cfg.get("base_workspace_id")
+                if base_ws_id and base_ws_id in ws_by_id:
+                    base_ws = ws_by_id[base_ws_id]
+                if base_ws is None:
+                    candidates = ws_by_project.get(pid, [])
+                    best = None
+                    for w in candidates:
+                        wpath = w.get("path")
+                        if not wpath:
+                            continue
+                        base_id = w.get("base_snapshot_id")
+                        if not base_id:
+                            snapshots_dir = os.path.join(wpath, _SNAPS)
+                            base_id = pick_snapshot_id(snapshots_dir, prefer="earliest")
+                        if not base_id:
+                            continue
+                        best = (w, base_id)
+                        break
+                    if best:
+                        base_ws, base_id = best
+                    else:
                         continue
-                    base_id = w.get("base_snapshot_id")
-                    if not base_id:
-                        snapshots_dir = Path(wpath) / ".fst" / "snapshots"
-                        base_id = pick_snapshot_id(snapshots_dir, prefer="earliest")
-                    if not base_id:
-                        continue
-                    best = (w, base_id)
-                    break
-                if best:
-                    base_ws, base_id = best
                 else:
-                    continue
-            else:
-                base_id = base_ws.get("base_snapshot_id")
-                if not base_id:
-                    wpath = base_ws.get("path")
-                    if wpath:
-                        base_id = pick_snapshot_id(Path(wpath) / ".fst" / "snapshots", prefer="earliest")
-
-            if base_ws and base_id:
-                parent_cfg["base_snapshot_id"] = base_id
-                parent_cfg["base_workspace_id"] = base_ws.get("workspace_id")
-                save_json(parent_cfg_path, parent_cfg)
-                updated_parents += 1
+                    base_id = base_ws.get("base_snapshot_id")
+                    if not base_id:
+                        wpath = base_ws.get("path")
+                        if wpath:
+                            base_id = pick_snapshot_id(os.path.join(wpath, _SNAPS), prefer="earliest")
 
-    if updated_index > 0:
-        save_json(index_path, index)
+                if base_ws and base_id:
+                    parent_cfg["base_snapshot_id"] = base_id
+                    parent_cfg["base_workspace_id"] = base_ws.get("workspace_id")
+                    save_json(parent_cfg_path, parent_cfg)
+                    updated_parents += 1
 
-    # Copy base snapshot metadata/manifests to all workspaces
-    for p in projects:
-        pid = p.get("project_id")
-        if not pid:
-            continue
-        parent_root = None
-        project_path = p.get("project_path")
-        if project_path:
-            candidate = Path(project_path) / "fst.json"
-            if candidate.exists():
-                parent_root = Path(project_path)
-        if parent_root is None:
-            for w in ws_by_project.get(pid, []):
-                wpath = w.get("path")
-                if not wpath:
-                    continue
-                parent_root = find_parent_root(Path(wpath))
-                if parent_root:
-                    break
-        if not parent_root:
-            continue
-        parent_cfg_path = parent_root / "fst.json"
-        parent_cfg = load_json(parent_cfg_path)
-        if parent_cfg is None:
-            continue
-        base_id = parent_cfg.get("base_snapshot_id")
-        base_ws_id = parent_cfg.get("base_workspace_id")
-        if not base_id or not base_ws_id:
-            continue
+            base_id = parent_cfg.get("base_snapshot_id")
+            base_ws_id = parent_cfg.get("base_workspace_id")
+            if not base_id or not base_ws_id:
+                continue
+            state = parent_state[parent_root] = (base_id, base_ws_id)
+        base_id, base_ws_id = state
         base_ws = ws_by_id.get(base_ws_id)
         if not base_ws:
             continue
         base_ws_path = base_ws.get("path")
         if not base_ws_path:
             continue
-        base_ws_path = Path(base_ws_path)
+        base_files = find_base_snapshot(base_ws_path, base_id)
+        if base_files is None:
+            continue
         for w in ws_by_project.get(pid, []):
             wpath = w.get("path")
             if not wpath:
                 continue
-            if copy_base_snapshot(base_ws_path, Path(wpath), base_id):
-                copied_bases += 1
+            copy_base_snapshot(*base_files, wpath)
+            copied_bases += 1
+
+    if updated_index > 0:
+        save_json(index_path, index)
 
-    print(f"Updated workspace configs: {updated_configs}")
-    print(f"Updated index entries: {updated_index}")
-    print(f"Updated parent configs: {updated_parents}")
-    print(f"Copied base snapshot into workspaces: {copied_bases}")
+    sys.stdout.write(
+        f"Updated workspace configs: {updated_configs}\n"
+        f"Updated index entries: {updated_index}\n"
+        f"Updated parent configs: {updated_parents}\n"
+        f"Copied base snapshot into workspaces: {copied_bases}\n"
+    )
 
 
 if __name__ == "__main__":